@@ -12,29 +12,84 @@ NOVITÀ:
 
 Requisiti:
   pip install pyyaml
+  pip install orjson   (opzionale, serializzazione JSON più veloce)
+
+Nota su orjson: a differenza del modulo json, solleva un errore per interi
+oltre i 64 bit e scrive NaN/Infinity come null (anche se arrivano da un
+file .crop.json esistente). Senza orjson l'output resta quello di json.dumps.
 """
 
 import argparse
 import base64
+import copy
+import functools
 import json
-import mimetypes
+import mmap
+import os
 import re
 import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 import yaml
 
+try:
+    # libyaml (C) se disponibile: molto più veloce del loader pure-Python
+    from yaml import CSafeLoader as _SafeLoader
+
+    _HAVE_LIBYAML = True
+except ImportError:
+    from yaml import SafeLoader as _SafeLoader
+
+    _HAVE_LIBYAML = False
+
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        """JSON indentato (2 spazi) in UTF-8, pronto da scrivere su file."""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+
+except ImportError:
 
-def read_file(path: Path) -> str:
-    return path.read_text(encoding="utf-8")
+    def _dumps(obj) -> bytes:
+        """JSON indentato (2 spazi) in UTF-8, pronto da scrivere su file."""
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
+
+def _write_bytes_fast(path, data: bytes) -> None:
+    """
+    Scrive data su path con os.open/os.write: niente TextIOWrapper né
+    buffer intermedio, dato che _dumps restituisce già bytes.
+    """
+    fd = os.open(path, _WRITE_FLAGS, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            # os.write può scrivere solo una parte dei dati
+            view = view[os.write(fd, view) :]
+    finally:
+        os.close(fd)
 
 
 def deep_merge(base: dict, override: dict) -> dict:
     """
     Merge ricorsivo: override vince su base.
+
+    Se override è vuoto restituisce base stesso, senza copia: il risultato può
+    condividere sotto-alberi con gli input e va trattato in sola lettura
+    (layered_lookup lo usa solo per serializzare il valore).
     """
+    if not override and isinstance(base, dict):
+        return base
     result = dict(base) if isinstance(base, dict) else {}
     for k, v in (override or {}).items():
+        if k in result and result[k] is v:
+            # stesso oggetto in entrambi i layer: niente da unire
+            continue
         if k in result and isinstance(result[k], dict) and isinstance(v, dict):
             result[k] = deep_merge(result[k], v)
         else:
@@ -42,42 +97,288 @@ def deep_merge(base: dict, override: dict) -> dict:
     return result
 
 
-def render_template(template_str: str, values: dict) -> str:
+def layered_lookup(parts, layers):
+    """
+    Risolve un path già splittato (es: ("ability", "name")) su una pila di
+    config, dalla più prioritaria (la config) alla base (defaults).
+    Equivale a get su deep_merge(defaults, cfg) ma senza allocare il merge:
+    i layer vengono solo letti, mai modificati.
     """
-    Sostituisce {{ key }} con values[key].
-    Supporta anche path con dot notation: {{ a.b.c }}
+    nodes = list(layers)
+    for part in parts:
+        found = []
+        for node in nodes:
+            if isinstance(node, dict) and part in node:
+                v = node[part]
+                if not isinstance(v, dict):
+                    # un valore non-dict sovrascrive i layer sottostanti
+                    if not found:
+                        found.append(v)
+                    break
+                found.append(v)
+        if not found:
+            return None
+        nodes = found
+    if len(nodes) == 1:
+        return nodes[0]
+    # dict presenti in più layer: materializza il merge solo per questo sotto-albero
+    merged = nodes[-1]
+    for node in reversed(nodes[:-1]):
+        merged = deep_merge(merged, node)
+    return merged
+
+
+# {{ key }} / {{ a.b.c }}: gruppo 1 = placeholder completo, gruppo 2 = chiave
+_PLACEHOLDER_RE = re.compile(r"({{\s*([a-zA-Z0-9_.-]+)\s*}})")
+
+# chiave dotted -> tuple dei segmenti, popolata durante la scansione del template
+_SPLIT_CACHE: dict[str, tuple] = {}
+
+# Nel testo del template: una stringa JSON (con i suoi escape) oppure un
+# placeholder fuori da stringa ("stats": {{stats}}).
+_TEMPLATE_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*"|{{\s*[a-zA-Z0-9_.-]+\s*}}', re.S)
+
+# Prefisso sentinella dei placeholder fuori da stringa, dopo parse_template
+_NATIVE_MARK = "\x00"
+
+
+def parse_template(template_text: str):
+    """
+    Parsa il testo JSON del template.
+    I placeholder fuori da stringa (es: "stats": {{stats}}, "retreatCost": {{ hp }})
+    non sono JSON valido: vengono sostituiti da una stringa sentinella
+    (_NATIVE_MARK + placeholder) che compile_template riconosce come slot
+    "nativo", valorizzato con l'oggetto risolto invece che con il suo testo.
     """
 
-    def lookup(path: str, ctx: dict):
-        cur = ctx
-        for part in path.split("."):
-            if isinstance(cur, dict) and part in cur:
-                cur = cur[part]
-            else:
-                return None
-        return cur
+    def protect(match):
+        token = match.group(0)
+        if token.startswith('"'):
+            return token
+        return json.dumps(_NATIVE_MARK + token)
 
-    pattern = re.compile(r"{{\s*([a-zA-Z0-9_.-]+)\s*}}")
+    return json.loads(_TEMPLATE_TOKEN_RE.sub(protect, template_text))
 
-    def replacer(match):
-        key = match.group(1)
-        val = lookup(key, values)
-        if val is None:
-            # Mantieni il placeholder se non c'è valore (utile per debug)
-            return match.group(0)
-        # Se è dict/list, serializza in JSON "inline" (template JSON)
-        if isinstance(val, (dict, list)):
-            return json.dumps(val, ensure_ascii=False)
-        return str(val)
 
-    return pattern.sub(replacer, template_str)
+def compile_template(template_obj) -> tuple[list, list, list, list]:
+    """
+    Analizza il template (già parsato) una sola volta.
+
+    Restituisce (keys, slots, key_slots, image_slots).
+    - keys: le chiavi dei placeholder trovati, ordinate (per diagnostica).
+    - slots: per ogni stringa che contiene {{ key }} una tupla
+      (path, key_or_index, parts, native), dove path è il percorso del contenitore padre
+      e parts alterna letterali e placeholder: [literal, (key, key_parts, raw), literal, ...].
+      key_parts è la chiave dotted già splittata, così il render non ripete lo split.
+      native indica un placeholder fuori da stringa (vedi parse_template).
+    - key_slots: per ogni dict con placeholder nelle chiavi la tupla
+      (path, {chiave: parts}), con i dict interni prima di quelli che li
+      contengono, così rinominare una chiave non invalida i path successivi.
+      Un placeholder fuori da stringa come chiave solleva ValueError: nel
+      render testuale produceva comunque JSON non valido.
+    - image_slots: per ogni immagine (dict dentro una lista "images", come
+      _iter_image_dicts, in ordine di documento) la tupla (path, inject_src).
+      inject_src vale solo per le immagini in rendered["images"] che hanno già
+      un campo "src": non tocca altri campi "src" per ridurre rischi di side effects.
+    Il render sostituisce i valori e solo alla fine rinomina le chiavi, quindi
+    la struttura (e questi path) è la stessa per ogni config, salvo placeholder
+    che risolvono in un dict/list (in quel caso render_compiled torna alla
+    visita completa).
+    """
+    slots = []
+    key_slots = []
+    image_slots = []
+
+    def split(text):
+        pieces = _PLACEHOLDER_RE.split(text)
+        if len(pieces) == 1:
+            return None
+        # pieces = [literal, raw, key, literal, raw, key, ..., literal]
+        parts = [pieces[0]]
+        for i in range(1, len(pieces), 3):
+            key = pieces[i + 1]
+            key_parts = _SPLIT_CACHE.get(key)
+            if key_parts is None:
+                key_parts = _SPLIT_CACHE[key] = tuple(key.split("."))
+            parts.append((key, key_parts, pieces[i]))
+            parts.append(pieces[i + 2])
+        return parts
+
+    def walk(node, path, in_images):
+        renames = {}
+        items = node.items() if isinstance(node, dict) else enumerate(node)
+        for k, v in items:
+            if isinstance(k, str) and "{{" in k:
+                if k.startswith(_NATIVE_MARK):
+                    raise ValueError(f"placeholder outside a JSON string used as an object key: {k[1:]}")
+                parts = split(k)
+                if parts is not None:
+                    renames[k] = parts
+            if k == "images" and isinstance(v, list) and isinstance(node, dict) and not in_images:
+                for i, item in enumerate(v):
+                    if isinstance(item, dict):
+                        image_slots.append((path + (k, i), path == () and "src" in item))
+                walk(v, path + (k,), True)
+            elif isinstance(v, str):
+                if "{{" not in v:
+                    continue
+                native = v.startswith(_NATIVE_MARK)
+                if native:
+                    v = v[len(_NATIVE_MARK) :]
+                parts = split(v)
+                if parts is not None:
+                    slots.append((path, k, parts, native))
+            elif isinstance(v, (dict, list)):
+                walk(v, path + (k,), in_images)
+        if renames:
+            key_slots.append((path, renames))
+
+    if isinstance(template_obj, (dict, list)):
+        walk(template_obj, (), False)
+    keys = {part[0] for _, _, parts, _ in slots for part in parts[1::2]}
+    keys.update(part[0] for _, renames in key_slots for parts in renames.values() for part in parts[1::2])
+    return sorted(keys), slots, key_slots, image_slots
+
+
+def _decode_json_escapes(text: str) -> str:
+    """
+    Compatibilità con il render testuale: il valore veniva inserito nel testo
+    JSON e decodificato da json.loads, quindi sequenze come \\n o \\u00e9
+    nel valore diventavano il carattere corrispondente. Se il testo non è un
+    contenuto di stringa JSON valido resta com'è.
+    """
+    if "\\" not in text:
+        return text
+    try:
+        return json.loads(f'"{text}"')
+    except ValueError:
+        return text
+
+
+def render_compiled(
+    template_obj, slots: list, key_slots: list, image_slots: list, layers, data_uri: str | None = None
+):
+    """
+    Clona il template e sostituisce i placeholder negli slot precalcolati
+    da compile_template. I valori sono risolti su layers (es: (cfg, defaults))
+    tramite layered_lookup:
+    - valore mancante (None): il placeholder resta com'è (utile per debug)
+    - slot nativo (placeholder fuori da stringa), o stringa fatta solo dal
+      placeholder con valore dict/list: l'oggetto risolto così com'è
+      (dict/list copiati, per non condividere sotto-alberi con defaults)
+    - slot nativo con altro valore: str(valore) parsato come JSON, come nel
+      render testuale; se non è JSON valido solleva json.JSONDecodeError
+    - dict/list dentro altro testo: serializzato in JSON "inline"
+    - altrimenti str(valore), con le sequenze di escape JSON decodificate
+      (vedi _decode_json_escapes)
+    Il render avviene sull'albero già parsato: non serve un json.loads per
+    ogni config.
+
+    Le chiavi in key_slots sono rinominate per ultime, con lo stesso testo
+    degli slot in stringa e senza cambiare l'ordine delle chiavi.
+
+    Nello stesso passaggio raccoglie le immagini indicate da image_slots e,
+    se data_uri è dato, ne valorizza "src": nessuna ulteriore visita dell'albero.
+    Se però uno slot ha inserito un dict/list la forma dell'albero è cambiata
+    e le immagini vengono cercate con una visita completa (_iter_image_dicts).
+    Restituisce (rendered, image_dicts).
+    """
+    rendered = copy.deepcopy(template_obj)
+    resolved = {}
+
+    def value_of(part):
+        key, key_parts, _ = part
+        if key not in resolved:
+            resolved[key] = layered_lookup(key_parts, layers)
+        return resolved[key]
+
+    def join_parts(parts) -> str:
+        chunks = []
+        for i, part in enumerate(parts):
+            if i % 2 == 0:
+                chunks.append(part)
+                continue
+            val = value_of(part)
+            if val is None:
+                # Mantieni il placeholder se non c'è valore (utile per debug)
+                chunks.append(part[2])
+            elif isinstance(val, (dict, list)):
+                chunks.append(json.dumps(val, ensure_ascii=False))
+            else:
+                chunks.append(_decode_json_escapes(str(val)))
+        return "".join(chunks)
+
+    structural = False
+    for path, k, parts, native in slots:
+        parent = rendered
+        for p in path:
+            parent = parent[p]
+        if native:
+            val = value_of(parts[1])
+            if val is None:
+                parent[k] = parts[1][2]
+            elif isinstance(val, (dict, list)):
+                parent[k] = copy.deepcopy(val)
+                structural = True
+            else:
+                # come il render testuale: str(valore) nel JSON, poi parsato
+                # ("350" -> 350, "true" -> true); se non è JSON valido
+                # solleva json.JSONDecodeError
+                parent[k] = json.loads(str(val))
+            continue
+        if len(parts) == 3 and not parts[0] and not parts[2]:
+            # stringa fatta solo dal placeholder: un dict/list prende il posto
+            # della stringa, come per gli slot nativi
+            val = value_of(parts[1])
+            if isinstance(val, (dict, list)):
+                parent[k] = copy.deepcopy(val)
+                structural = True
+                continue
+        parent[k] = join_parts(parts)
+
+    if structural:
+        image_dicts = list(_iter_image_dicts(rendered))
+        images = rendered.get("images") if isinstance(rendered, dict) else None
+        if data_uri is not None and isinstance(images, list):
+            for item in images:
+                if isinstance(item, dict) and "src" in item:
+                    item["src"] = data_uri
+    else:
+        image_dicts = []
+        for path, inject_src in image_slots:
+            img = rendered
+            for p in path:
+                img = img[p]
+            if inject_src and data_uri is not None:
+                img["src"] = data_uri
+            image_dicts.append(img)
+
+    for path, renames in key_slots:
+        node = rendered
+        for p in path:
+            node = node[p]
+        # ricostruisce il dict sul posto: stesso oggetto (già raccolto in
+        # image_dicts) e stesso ordine delle chiavi; come json.loads, una
+        # chiave duplicata tiene la prima posizione e l'ultimo valore
+        items = list(node.items())
+        node.clear()
+        for k, v in items:
+            parts = renames.get(k)
+            node[k if parts is None else join_parts(parts)] = v
+    return rendered, image_dicts
+
+
+_PICTURE_EXTS = [".jpg", ".jpeg", ".png", ".webp"]
+
+# MIME type per le estensioni supportate (niente database di mimetypes)
+_MIME = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png", ".webp": "image/webp"}
 
 
 def _find_image_for_stem(pictures_dir: Path, stem: str) -> Path | None:
     """
     Cerca un'immagine con nome = stem in pictures_dir, provando estensioni comuni.
     """
-    exts = [".jpg", ".jpeg", ".png", ".webp"]
+    exts = _PICTURE_EXTS
     for ext in exts:
         p = pictures_dir / f"{stem}{ext}"
         if p.exists() and p.is_file():
@@ -89,28 +390,78 @@ def _find_image_for_stem(pictures_dir: Path, stem: str) -> Path | None:
     return None
 
 
-def _data_uri_from_image(img_path: Path) -> str:
-    mime, _ = mimetypes.guess_type(str(img_path))
-    if not mime:
-        # default ragionevole
-        mime = "image/jpeg"
-    raw = img_path.read_bytes()
-    b64 = base64.b64encode(raw).decode("ascii")
-    return f"data:{mime};base64,{b64}"
-
-
-def _inject_src_into_images(rendered: dict, data_uri: str) -> None:
+def build_picture_index(pictures_dir: Path) -> dict[str, Path]:
     """
-    Aggiorna rendered["images"][*]["src"] se presente.
-    Non tocca altri campi "src" fuori da "images" per ridurre rischi di side effects.
+    Scansiona pictures_dir una sola volta e restituisce {stem: Path}, così la
+    ricerca dell'immagine per ogni config non fa syscall.
+    Le chiavi sono os.path.normcase(stem): su Windows il confronto resta
+    case-insensitive come i vecchi Path.exists(). Cercare con la stessa normcase.
+    A parità di stem vale lo stesso ordine di _find_image_for_stem: prima le
+    estensioni esatte (.jpg, .jpeg, .png, .webp), poi le varianti maiuscole.
+    Se la cartella non è leggibile l'indice è vuoto (si usa l'immagine di default).
     """
-    images = rendered.get("images")
-    if isinstance(images, list):
-        for item in images:
-            if isinstance(item, dict) and "src" in item:
-                item["src"] = data_uri
+    index: dict[str, Path] = {}
+    ranks: dict[str, int] = {}
+    try:
+        entries = os.scandir(pictures_dir)
+    except OSError:
+        return index
+    with entries:
+        for entry in entries:
+            stem, ext = os.path.splitext(entry.name)
+            stem = os.path.normcase(stem)
+            if ext in _PICTURE_EXTS:
+                rank = _PICTURE_EXTS.index(ext)
+            elif ext.lower() in _PICTURE_EXTS:
+                rank = len(_PICTURE_EXTS) + _PICTURE_EXTS.index(ext.lower())
+            else:
+                continue
+            if stem in ranks and ranks[stem] <= rank:
+                continue
+            if not entry.is_file():
+                continue
+            index[stem] = Path(entry.path)
+            ranks[stem] = rank
+    return index
+
+
+# multiplo di 3: i blocchi base64 si concatenano senza padding intermedio
+_B64_CHUNK = 3 * 65536
 
 
+def _data_uri_from_image(img_path: Path) -> str:
+    # default ragionevole: image/jpeg
+    mime = _MIME.get(img_path.suffix.lower(), "image/jpeg")
+    prefix = f"data:{mime};base64,".encode("ascii")
+    # il file è mappato in memoria (mmap) e codificato a blocchi in un buffer
+    # già dimensionato: nessuna copia intera del file in userspace accanto
+    # alla sua versione base64
+    with img_path.open("rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        buf = bytearray(len(prefix) + ((size + 2) // 3) * 4)
+        buf[: len(prefix)] = prefix
+        if size == 0:
+            # mmap non accetta file vuoti
+            return buf.decode("ascii")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = len(prefix)
+            for start in range(0, len(mm), _B64_CHUNK):
+                enc = base64.b64encode(mm[start : start + _B64_CHUNK])
+                buf[pos : pos + len(enc)] = enc
+                pos += len(enc)
+    # il file potrebbe essere cambiato tra fstat e mmap
+    del buf[pos:]
+    return buf.decode("ascii")
+
+
+@functools.lru_cache(maxsize=None)
+def _data_uri_cached(path_str: str, mtime_ns: int) -> str:
+    """
+    Data-URI memoizzata per path: le config senza immagine propria condividono
+    defaults.jpg, che così viene letta e codificata una sola volta.
+    mtime_ns fa parte della chiave, quindi un file modificato viene ricodificato.
+    """
+    return _data_uri_from_image(Path(path_str))
 
 
 # ----------------------------
@@ -128,17 +479,23 @@ _CROP_KEYS = [
 
 def _iter_image_dicts(obj):
     """Yield dict items that look like image objects inside any 'images' list."""
-    if isinstance(obj, dict):
-        for k, v in obj.items():
-            if k == "images" and isinstance(v, list):
-                for item in v:
-                    if isinstance(item, dict):
-                        yield item
-            else:
-                yield from _iter_image_dicts(v)
-    elif isinstance(obj, list):
-        for item in obj:
-            yield from _iter_image_dicts(item)
+    # Iterative DFS: the stack holds (is_image, node) pairs, pushed in reverse
+    # so items come out in document order (the first image matters to the sidecar).
+    stack = [(False, obj)]
+    while stack:
+        is_image, cur = stack.pop()
+        if is_image:
+            yield cur
+        elif isinstance(cur, dict):
+            pending = []
+            for k, v in cur.items():
+                if k == "images" and isinstance(v, list):
+                    pending.extend((True, item) for item in v if isinstance(item, dict))
+                elif isinstance(v, (dict, list)):
+                    pending.append((False, v))
+            stack.extend(reversed(pending))
+        elif isinstance(cur, list):
+            stack.extend((False, item) for item in reversed(cur) if isinstance(item, (dict, list)))
 
 def _extract_crop_params_from_image(img_dict):
     params = {}
@@ -153,30 +510,86 @@ def _apply_crop_params_to_image(img_dict, params):
 
 
 
-def _apply_crop_params_to_images(rendered_json: dict, crop_params: dict) -> None:
-    """Apply crop-related params to every image dict inside rendered_json."""
-    for img_dict in _iter_image_dicts(rendered_json):
+def _apply_crop_params_to_images(image_dicts: list, crop_params: dict) -> None:
+    """Apply crop-related params to every image dict (as collected by _iter_image_dicts)."""
+    for img_dict in image_dicts:
         _apply_crop_params_to_image(img_dict, crop_params)
-def _sync_crop_sidecar(rendered_json: dict, sidecar_path: Path) -> None:
+
+
+# Parsed sidecars, keyed by path: (st_mtime_ns, parsed JSON).
+# Many configs share one picture (e.g. defaults.jpg), hence one sidecar.
+_sidecar_cache: dict[str, tuple[int, object]] = {}
+
+
+def _load_sidecar(sidecar_path: str):
+    """
+    Parse a sidecar, reusing the previous parse while its mtime is unchanged.
+    Raises FileNotFoundError if the sidecar does not exist (no separate exists() check).
+    """
+    mtime_ns = os.stat(sidecar_path).st_mtime_ns
+    entry = _sidecar_cache.get(sidecar_path)
+    if entry is not None and entry[0] == mtime_ns:
+        return entry[1]
+    with open(sidecar_path, "rb") as f:
+        existing = json.loads(f.read())
+    _sidecar_cache[sidecar_path] = (mtime_ns, existing)
+    return existing
+
+
+def _write_sidecar(sidecar_path: str, obj) -> None:
+    """
+    Write a sidecar and record it in _sidecar_cache under its new mtime, so the
+    next config sharing the picture does not re-read what was just written.
+    On failure the entry is dropped: the file may be missing or partial.
+    """
+    try:
+        _write_bytes_fast(sidecar_path, _dumps(obj))
+        _sidecar_cache[sidecar_path] = (os.stat(sidecar_path).st_mtime_ns, obj)
+    except Exception:
+        _sidecar_cache.pop(sidecar_path, None)
+
+
+def _sidecar_settled(sidecar_path: str) -> bool:
+    """
+    True if _sync_crop_sidecar will not write this sidecar again: it exists with
+    a dexStats already set, or it cannot be parsed (and is then ignored).
+    From there on the configs sharing it can be generated in parallel.
+    """
+    try:
+        existing = _load_sidecar(sidecar_path)
+    except FileNotFoundError:
+        return False
+    except Exception:
+        return True
+    return isinstance(existing, dict) and existing.get("dexStats") is not None
+
+
+def _sync_crop_sidecar(rendered_json: dict, sidecar_path: str, imgs: list | None = None) -> None:
     """
     Keep image crop parameters + dexStats stable across generations.
 
     - If sidecar exists: use it as the source of truth and apply to rendered_json.
     - If sidecar does NOT exist: extract crop params from rendered_json (template-derived),
       store them + dexStats into sidecar.
+
+    imgs: image dicts already collected by render_compiled; walked here if omitted.
     """
-    imgs = list(_iter_image_dicts(rendered_json))
+    if imgs is None:
+        imgs = list(_iter_image_dicts(rendered_json))
     if not imgs:
         return
 
-    if sidecar_path.exists():
-        try:
-            existing = json.loads(sidecar_path.read_text(encoding="utf-8"))
-        except Exception:
-            return
+    try:
+        existing = _load_sidecar(sidecar_path)
+        sidecar_existed = True
+    except FileNotFoundError:
+        sidecar_existed = False
+    except Exception:
+        return
 
+    if sidecar_existed:
         # Apply stored crop params (if any)
-        _apply_crop_params_to_images(rendered_json, existing)
+        _apply_crop_params_to_images(imgs, existing)
 
         # Apply stored dexStats (if any)
         if isinstance(existing, dict) and existing.get("dexStats") is not None:
@@ -184,13 +597,10 @@ def _sync_crop_sidecar(rendered_json: dict, sidecar_path: Path) -> None:
         else:
             # Persist dexStats once if missing in sidecar
             if rendered_json.get("dexStats") is not None:
-                if not isinstance(existing, dict):
-                    existing = {}
+                # copy: the parsed sidecar is shared through _sidecar_cache
+                existing = dict(existing) if isinstance(existing, dict) else {}
                 existing["dexStats"] = rendered_json["dexStats"]
-                try:
-                    sidecar_path.write_text(json.dumps(existing, ensure_ascii=False, indent=2), encoding="utf-8")
-                except Exception:
-                    pass
+                _write_sidecar(sidecar_path, existing)
         return
 
     # Sidecar missing: create it from template-derived values in rendered_json
@@ -203,17 +613,74 @@ def _sync_crop_sidecar(rendered_json: dict, sidecar_path: Path) -> None:
     if rendered_json.get("dexStats") is not None:
         sidecar["dexStats"] = rendered_json["dexStats"]
 
-    sidecar_path.parent.mkdir(parents=True, exist_ok=True)
-    try:
-        sidecar_path.write_text(json.dumps(sidecar, ensure_ascii=False, indent=2), encoding="utf-8")
-    except Exception:
-        pass
+    # no mkdir: the sidecar sits next to its picture, so the directory exists
+    _write_sidecar(sidecar_path, sidecar)
 def load_yaml(path: Path) -> dict:
     with path.open("r", encoding="utf-8") as f:
-        data = yaml.safe_load(f)
+        data = yaml.load(f, Loader=_SafeLoader)
     return data or {}
 
 
+# Stato condiviso dai task di generazione: impostato una sola volta per processo
+# da _init_worker, così template e defaults non vengono ri-serializzati per ogni config.
+_WORKER: dict = {}
+
+
+def _init_worker(
+    template_obj, slots: list, key_slots: list, image_slots: list, defaults: dict, out_dir: Path
+) -> None:
+    # out_dir come stringa: i path di output si compongono con os.path.join, senza Path per config
+    _WORKER.update(
+        template_obj=template_obj,
+        slots=slots,
+        key_slots=key_slots,
+        image_slots=image_slots,
+        defaults=defaults,
+        out_dir=str(out_dir),
+    )
+
+
+def process_one(config_path: Path, img: Path) -> str:
+    """
+    Genera il JSON di una singola config con la sua immagine già risolta.
+    Restituisce la riga di log, stampata dal processo principale.
+    """
+    cfg = load_yaml(config_path)
+    img_str = str(img)
+    data_uri = _data_uri_cached(img_str, os.stat(img_str).st_mtime_ns)
+    # render, raccolta immagini e "src" in un solo passaggio;
+    # nessun merge per config: i placeholder leggono prima cfg, poi defaults
+    try:
+        rendered, image_dicts = render_compiled(
+            _WORKER["template_obj"],
+            _WORKER["slots"],
+            _WORKER["key_slots"],
+            _WORKER["image_slots"],
+            (cfg, _WORKER["defaults"]),
+            data_uri,
+        )
+    except json.JSONDecodeError as e:
+        print(f"[ERROR] JSON parse failed for {config_path.name}: {e}", file=sys.stderr)
+        print("Rendered content (first 500 chars):", file=sys.stderr)
+        print(e.doc[:500], file=sys.stderr)
+        sys.exit(2)
+
+    # Keep crop params stable via sidecar file (editable once, reused forever)
+    sidecar = img_str + ".crop.json"
+    _sync_crop_sidecar(rendered, sidecar, image_dicts)
+
+    out_path = os.path.join(_WORKER["out_dir"], config_path.stem + ".json")
+    _write_bytes_fast(out_path, _dumps(rendered))
+    return f"Generated: {out_path} (image: {img.name})"
+
+
+def _positive_int(text: str) -> int:
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be >= 1, got {value}")
+    return value
+
+
 def main():
     parser = argparse.ArgumentParser(description="Generate cards from template and YAML configs.")
     parser.add_argument("--template", required=True, help="Path to JSON template file (with {{placeholders}}).")
@@ -228,6 +695,12 @@ def main():
             "Default: sibling 'pictures' next to configs-dir."
         ),
     )
+    parser.add_argument(
+        "--jobs",
+        type=_positive_int,
+        default=None,
+        help="Number of worker processes (1 = no process pool). Default: number of CPUs.",
+    )
 
     args = parser.parse_args()
 
@@ -254,30 +727,32 @@ def main():
 
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    template_str = read_file(template_path)
+    if not _HAVE_LIBYAML:
+        print("[WARN] PyYAML built without libyaml: using the slower pure-Python loader.", file=sys.stderr)
+
     defaults = load_yaml(defaults_path)
 
+    # parse JSON del template una sola volta: per ogni config si sostituiscono
+    # solo i valori negli slot, senza regex né json.loads
+    try:
+        template_obj = parse_template(template_path.read_text(encoding="utf-8"))
+        keys, slots, key_slots, image_slots = compile_template(template_obj)
+    except ValueError as e:
+        # json.JSONDecodeError è una ValueError
+        print(f"[ERROR] JSON parse failed for {template_path.name}: {e}", file=sys.stderr)
+        sys.exit(2)
+    print(f"Template placeholders ({len(keys)}): {', '.join(keys)}")
+
     # Defaults image: cerca defaults.{jpg|jpeg|png|webp} affiancata a defaults.yml
     defaults_img = _find_image_for_stem(defaults_path.parent, defaults_path.stem)
 
-    # itera sui config yaml
+    # indice delle immagini: una sola scansione di pictures_dir
+    pictures = build_picture_index(pictures_dir)
+
+    # risolvi l'immagine di ogni config prima di generare
+    jobs = []
     for config_path in sorted(configs_dir.glob("*.yml")):
-        cfg = load_yaml(config_path)
-        merged = deep_merge(defaults, cfg)
-
-        rendered_str = render_template(template_str, merged)
-
-        # parse JSON
-        try:
-            rendered = json.loads(rendered_str)
-        except json.JSONDecodeError as e:
-            print(f"[ERROR] JSON parse failed for {config_path.name}: {e}", file=sys.stderr)
-            print("Rendered content (first 500 chars):", file=sys.stderr)
-            print(rendered_str[:500], file=sys.stderr)
-            sys.exit(2)
-
-        # risolvi immagine per questa config
-        img = _find_image_for_stem(pictures_dir, config_path.stem)
+        img = pictures.get(os.path.normcase(config_path.stem))
         if img is None:
             img = defaults_img
 
@@ -288,17 +763,48 @@ def main():
                 file=sys.stderr,
             )
             sys.exit(3)
+        jobs.append((config_path, img))
 
-        data_uri = _data_uri_from_image(img)
-        _inject_src_into_images(rendered, data_uri)
-
-        # Keep crop params stable via sidecar file (editable once, reused forever)
-        sidecar = img.parent / f"{img.name}.crop.json"
-        _sync_crop_sidecar(rendered, sidecar)
+    worker_args = (template_obj, slots, key_slots, image_slots, defaults, out_dir)
+    if args.jobs == 1 or len(jobs) <= 1:
+        _init_worker(*worker_args)
+        for config_path, img in jobs:
+            print(process_one(config_path, img))
+        return
 
-        out_path = out_dir / f"{config_path.stem}.json"
-        out_path.write_text(json.dumps(rendered, ensure_ascii=False, indent=2), encoding="utf-8")
-        print(f"Generated: {out_path} (image: {img.name})")
+    workers = args.jobs or os.cpu_count() or 1
+    # indici delle config per immagine, in ordine
+    queues: dict[Path, deque] = {}
+    for i, (_, img) in enumerate(jobs):
+        queues.setdefault(img, deque()).append(i)
+
+    lines: dict[int, str] = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=worker_args) as ex:
+        # Le config di un'immagine condividono il sidecar: finché può ancora
+        # essere scritto (es: non esiste) gira una sola config per immagine a
+        # round, in ordine. Poi il sidecar è solo letto e il resto va in parallelo.
+        while True:
+            seeds = [
+                queue.popleft()
+                for img, queue in queues.items()
+                if queue and not _sidecar_settled(str(img) + ".crop.json")
+            ]
+            if not seeds:
+                break
+            futures = [ex.submit(process_one, *jobs[i]) for i in seeds]
+            for i, future in zip(seeds, futures):
+                lines[i] = future.result()
+
+        rest = sorted(i for queue in queues.values() for i in queue)
+        results = ex.map(
+            process_one,
+            [jobs[i][0] for i in rest],
+            [jobs[i][1] for i in rest],
+            chunksize=max(1, len(rest) // (workers * 4)),
+        )
+        # log nell'ordine delle config
+        for i in range(len(jobs)):
+            print(lines[i] if i in lines else next(results))
 
 
 if __name__ == "__main__":